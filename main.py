@@ -1,42 +1,379 @@
-from datetime import datetime, timedelta
-from statistics import mean, stdev
-from typing import List
+import asyncio
+import gzip
+import hashlib
+import heapq
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Optional
+from uuid import uuid4
 
+import aiohttp
+import fastjsonschema
 import firebase_admin
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+import orjson
+
+try:
+    import numpy as np
+except ImportError:  # constrained deploys — fall back to the fused pure-Python path
+    np = None
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from firebase_admin import credentials, db
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from pydantic import BaseModel
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+
+DATABASE_URL = 'https://realtimetemp-4fb14-default-rtdb.asia-southeast1.firebasedatabase.app'
 
-# Initialize Firebase
+# Initialize Firebase (kept for credential/token minting; data access goes
+# through the REST API below so handlers never block the event loop)
 cred = credentials.Certificate('firebaseSecret.json')
 firebase_admin.initialize_app(cred, {
-    'databaseURL': 'https://realtimetemp-4fb14-default-rtdb.asia-southeast1.firebasedatabase.app'
+    'databaseURL': DATABASE_URL
 })
 
-app = FastAPI()
+_google_cred = cred.get_credential()
+_session = None  # aiohttp.ClientSession, created on startup
+
+# Built once — db.reference() walks the app registry and rebuilds the path
+# object on every call, so pin the refs the write path still uses
+_STATS_REF = db.reference('stats')
+_READINGS_REF = db.reference('readings')
+
+# Live-update plumbing: the RTDB listener runs on firebase_admin's own
+# thread and hands new readings to each connected SSE client's queue
+_stream_subscribers = set()  # asyncio.Queue per connected /stream client
+_event_loop = None  # captured in lifespan for call_soon_threadsafe
+_listener = None
+
+
+def _on_reading_event(event):
+    """Forward RTDB listen events to SSE subscribers (listener-thread side)."""
+    if _event_loop is None or not _stream_subscribers or event.data is None:
+        return
+    if event.path == '/':
+        if event.event_type == 'put':
+            return  # initial snapshot — clients bootstrap via /readings
+        new_readings = event.data.values()  # multi-location patch
+    else:
+        new_readings = [event.data]  # single push: path is '/<key>'
+
+    for reading in new_readings:
+        data = orjson.dumps(reading).decode()
+        for queue in list(_stream_subscribers):
+            _event_loop.call_soon_threadsafe(queue.put_nowait, data)
+
+
+async def _auth_headers():
+    if not _google_cred.valid:
+        # Token refresh is a blocking google-auth call — push it off the loop
+        await run_in_threadpool(_google_cred.refresh, GoogleAuthRequest())
+    return {'Authorization': f'Bearer {_google_cred.token}'}
+
 
+async def _db_request(method, path, *, params=None, json=None):
+    """Async Firebase RTDB REST call; refreshes the cached token once on 401."""
+    url = f'{DATABASE_URL}/{path}.json'
+    for attempt in (1, 2):
+        async with _session.request(method, url, params=params, json=json,
+                                    headers=await _auth_headers()) as resp:
+            if resp.status == 401 and attempt == 1:
+                _google_cred.token = None  # force a refresh on retry
+                continue
+            resp.raise_for_status()
+            return await resp.json(loads=orjson.loads)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _session, _event_loop, _listener
+    _session = aiohttp.ClientSession()
+    _event_loop = asyncio.get_running_loop()
+    # listen() opens a blocking SSE connection before returning its registration
+    _listener = await run_in_threadpool(_READINGS_REF.listen, _on_reading_event)
+    yield
+    if _listener is not None:
+        await run_in_threadpool(_listener.close)
+    await _session.close()
+
+
+# orjson serializes large /readings payloads several times faster than stdlib json
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Exact origins instead of '*' (the old wildcard + credentials combination is
+# spec-invalid anyway); max_age lets browsers cache preflight results
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for development
-    allow_credentials=True,
-    allow_methods=["*"],  # Allow all methods
-    allow_headers=["*"],  # Allow all headers
-    expose_headers=["*"],  # Expose all headers
+    allow_origins=os.environ.get(
+        'ALLOWED_ORIGINS', 'http://localhost:8000,http://127.0.0.1:8000').split(','),
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Content-Type"],
+    max_age=86400,
 )
 
+app.add_middleware(GZipMiddleware, minimum_size=500)
 
-# Data Models
-class SensorReading(BaseModel):
-    temperature: float
-    humidity: float
 
+# Incoming readings are validated by a schema compiled to a plain function at
+# import time — range checks included, far cheaper than per-request models
+_validate_reading = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['temperature', 'humidity'],
+    'properties': {
+        'temperature': {'type': 'number', 'minimum': -50, 'maximum': 150},
+        'humidity': {'type': 'number', 'minimum': 0, 'maximum': 100}
+    },
+    'additionalProperties': False
+})
 
+
+# Data Models
 class ReadingResponse(BaseModel):
     temperature: float
     humidity: float
     timestamp: str
+    ts: int  # epoch millis — clients use it as the high-water mark for delta fetches
+
+
+# Short-lived in-process cache of fetched reading windows so the dashboard's
+# back-to-back /readings + /analysis calls don't re-download the same data
+_READINGS_CACHE_TTL = 60.0  # seconds
+_readings_cache = {}  # hours -> (expiry from time.monotonic(), readings dict)
+
+# Computed /analysis payloads, keyed by (hours, data version) so a write that
+# lands while an analysis is in flight can't park a stale result in the cache
+_ANALYSIS_CACHE_TTL = 15.0  # seconds
+_ANALYSIS_CACHE_HEADERS = {'Cache-Control': 'public, max-age=15'}
+_analysis_cache = {}  # (hours, version) -> (expiry from time.monotonic(), payload)
+_data_version = 0
+
+
+def _invalidate_caches():
+    global _data_version
+    _data_version += 1
+    _readings_cache.clear()
+    _analysis_cache.clear()
+
+
+async def _get_recent_readings(hours: int):
+    """Fetch readings newer than the cutoff, letting the RTDB server do the
+    range filter on the indexed 'ts' child instead of downloading everything.
+
+    Returns a dict ordered by 'ts', so callers can skip re-sorting.
+    """
+    cached = _readings_cache.get(hours)
+    if cached and time.monotonic() < cached[0]:
+        return cached[1]
+
+    # Plain epoch arithmetic — no datetime/timedelta objects per request
+    cutoff_ms = int((time.time() - hours * 3600) * 1000)
+    readings = await _fetch_readings_since(cutoff_ms)
+    _readings_cache[hours] = (time.monotonic() + _READINGS_CACHE_TTL, readings)
+    return readings
+
+
+async def _fetch_readings_since(cutoff_ms: int):
+    raw = await _db_request('get', 'readings',
+                            params={'orderBy': '"ts"', 'startAt': cutoff_ms}) or {}
+    # The REST API filters server-side but JSON objects carry no order —
+    # restore it here (push ids are chronological, so this is a near-sorted sort)
+    return dict(sorted(raw.items(), key=lambda kv: kv[1]['ts']))
+
+
+_BUCKET_MS = 3_600_000  # rolling aggregates are kept per hour
+
+
+def _fold_into_bucket(current, temperature, humidity):
+    """Merge one reading into a rolling-aggregate bucket dict."""
+    if current is None:
+        return {
+            'count': 1,
+            'sum_t': temperature, 'sum_t2': temperature * temperature,
+            'min_t': temperature, 'max_t': temperature,
+            'sum_h': humidity, 'sum_h2': humidity * humidity,
+            'min_h': humidity, 'max_h': humidity
+        }
+    current['count'] += 1
+    current['sum_t'] += temperature
+    current['sum_t2'] += temperature * temperature
+    current['min_t'] = min(current['min_t'], temperature)
+    current['max_t'] = max(current['max_t'], temperature)
+    current['sum_h'] += humidity
+    current['sum_h2'] += humidity * humidity
+    current['min_h'] = min(current['min_h'], humidity)
+    current['max_h'] = max(current['max_h'], humidity)
+    return current
+
+
+async def _update_stats_bucket(ts_ms, samples):
+    """Fold (temperature, humidity) samples into the hourly /stats bucket.
+
+    Runs a firebase_admin transaction (blocking HTTP) in the threadpool so
+    concurrent writers can't lose updates to the running sums.
+    """
+    ref = _STATS_REF.child(str(ts_ms // _BUCKET_MS))
+
+    def txn(current):
+        for temperature, humidity in samples:
+            current = _fold_into_bucket(current, temperature, humidity)
+        return current
+
+    await run_in_threadpool(ref.transaction, txn)
+
+
+_MAX_ANOMALIES = 5  # cap reported anomalies to the worst few
+
+
+def _analyze_readings(readings):
+    """Stats, trends and anomalies for an ordered readings window."""
+    if np is not None:
+        return _analyze_vectorized(readings)
+    return _analyze_fused(readings)
+
+
+def _analyze_vectorized(readings):
+    """NumPy path: a handful of C-level vector ops over the whole window."""
+    n = len(readings)
+    half = n // 2
+    temps = np.fromiter((r['temperature'] for r in readings.values()), dtype=np.float64, count=n)
+    humidities = np.fromiter((r['humidity'] for r in readings.values()), dtype=np.float64, count=n)
+    timestamps = [r['timestamp'] for r in readings.values()]  # ISO strings, already sorted by 'ts'
+
+    stats = {
+        'avg_temp': float(temps.mean()),
+        'avg_humidity': float(humidities.mean()),
+        'max_temp': float(temps.max()),
+        'min_temp': float(temps.min()),
+        'max_humidity': float(humidities.max()),
+        'min_humidity': float(humidities.min()),
+    }
+
+    if n > 1:
+        stats['temp_trend'] = "↑ Rising" if temps[half:].mean() > temps[:half].mean() else "↓ Falling"
+        stats['humidity_trend'] = "↑ Rising" if humidities[half:].mean() > humidities[:half].mean() else "↓ Falling"
+    else:
+        stats['temp_trend'] = stats['humidity_trend'] = "→ Stable"
+
+    # Anomaly detection (vectorized: one boolean mask instead of a Python loop)
+    anomalies = []
+    if n > 2:
+        temp_std = float(temps.std(ddof=1))
+        humidity_std = float(humidities.std(ddof=1))
+        temp_dev = np.abs(temps - stats['avg_temp'])
+        humidity_dev = np.abs(humidities - stats['avg_humidity'])
+        # A zero-spread series has no spikes — without the std > 0 guard,
+        # float rounding dust in the deviations would flag every reading
+        temp_spike = (temp_dev > 2 * temp_std) if temp_std > 0 else np.zeros(n, dtype=bool)
+        humidity_spike = (humidity_dev > 2 * humidity_std) if humidity_std > 0 else np.zeros(n, dtype=bool)
+        flagged = np.nonzero(temp_spike | humidity_spike)[0]
+
+        if len(flagged) > _MAX_ANOMALIES:
+            # Keep the MAX worst by sigma-distance — argpartition is O(N),
+            # no full sort needed (a zero std can't flag, so `or 1.0` is safe)
+            score = np.maximum(temp_dev[flagged] / (temp_std or 1.0),
+                               humidity_dev[flagged] / (humidity_std or 1.0))
+            flagged = np.sort(flagged[np.argpartition(-score, _MAX_ANOMALIES)[:_MAX_ANOMALIES]])
+
+        for i in flagged:
+            anomalies.append({
+                'temperature': float(temps[i]),
+                'humidity': float(humidities[i]),
+                'timestamp': timestamps[i],
+                'reason': 'Temperature spike' if temp_spike[i] else 'Humidity spike'
+            })
+
+    stats['anomalies'] = anomalies
+    return stats
+
+
+def _analyze_fused(readings):
+    """Pure-Python path: one fused pass computes sums, squares, extrema and
+    the half-window sums for both series instead of six separate walks."""
+    n = len(readings)
+    half = n // 2
+    temps = []
+    humidities = []
+    timestamps = []
+    s_t = s2_t = s1_t = 0.0
+    s_h = s2_h = s1_h = 0.0
+    mn_t = mn_h = math.inf
+    mx_t = mx_h = -math.inf
+
+    for i, r in enumerate(readings.values()):
+        t = r['temperature']
+        h = r['humidity']
+        temps.append(t)
+        humidities.append(h)
+        timestamps.append(r['timestamp'])
+        s_t += t
+        s2_t += t * t
+        s_h += h
+        s2_h += h * h
+        if t < mn_t:
+            mn_t = t
+        if t > mx_t:
+            mx_t = t
+        if h < mn_h:
+            mn_h = h
+        if h > mx_h:
+            mx_h = h
+        if i < half:
+            s1_t += t
+            s1_h += h
+
+    avg_temp = s_t / n
+    avg_humidity = s_h / n
+    stats = {
+        'avg_temp': avg_temp,
+        'avg_humidity': avg_humidity,
+        'max_temp': mx_t,
+        'min_temp': mn_t,
+        'max_humidity': mx_h,
+        'min_humidity': mn_h,
+    }
+
+    if n > 1:
+        stats['temp_trend'] = "↑ Rising" if (s_t - s1_t) / (n - half) > s1_t / half else "↓ Falling"
+        stats['humidity_trend'] = "↑ Rising" if (s_h - s1_h) / (n - half) > s1_h / half else "↓ Falling"
+    else:
+        stats['temp_trend'] = stats['humidity_trend'] = "→ Stable"
+
+    anomalies = []
+    if n > 2:
+        # Sample std from the running sums; the max() guards against the tiny
+        # negative rounding residue when all values are equal
+        temp_std = math.sqrt(max(0.0, (s2_t - s_t * s_t / n) / (n - 1)))
+        humidity_std = math.sqrt(max(0.0, (s2_h - s_h * s_h / n) / (n - 1)))
+        thr_t = 2 * temp_std
+        thr_h = 2 * humidity_std
+
+        scored = []  # (sigma-distance, position, entry)
+        for i, (ts, t, h) in enumerate(zip(timestamps, temps, humidities)):
+            # Same std > 0 guard as the NumPy path: a zero-spread series has
+            # no spikes, only float rounding dust in the deviations
+            temp_dev = abs(t - avg_temp) if temp_std > 0 else 0.0
+            humidity_dev = abs(h - avg_humidity) if humidity_std > 0 else 0.0
+            if temp_dev > thr_t or humidity_dev > thr_h:
+                score = max(temp_dev / (temp_std or 1.0), humidity_dev / (humidity_std or 1.0))
+                scored.append((score, i, {
+                    'temperature': t,
+                    'humidity': h,
+                    'timestamp': ts,
+                    'reason': 'Temperature spike' if temp_dev > thr_t else 'Humidity spike'
+                }))
+
+        if len(scored) > _MAX_ANOMALIES:
+            scored = heapq.nlargest(_MAX_ANOMALIES, scored, key=lambda s: s[:2])
+            scored.sort(key=lambda s: s[1])  # back to chronological order
+        anomalies = [entry for _, _, entry in scored]
+
+    stats['anomalies'] = anomalies
+    return stats
 
 
 # Routes
@@ -49,21 +386,24 @@ async def root_head():
     return { "message": "Temperature & Humidity Tracking API", "version": "1.0"}
 
 @app.post("/reading")
-async def add_reading(reading: SensorReading):
+async def add_reading(request: Request):
     """Add a new temperature and humidity reading"""
     try:
-        if not (-50 <= reading.temperature <= 150):
-            raise HTTPException(status_code=400, detail="Temperature out of valid range")
-        if not (0 <= reading.humidity <= 100):
-            raise HTTPException(status_code=400, detail="Humidity must be between 0 and 100")
+        try:
+            reading = _validate_reading(orjson.loads(await request.body()))
+        except (orjson.JSONDecodeError, fastjsonschema.JsonSchemaException) as e:
+            raise HTTPException(status_code=422, detail=str(e))
 
-        ref = db.reference('readings')
+        now_ns = time.time_ns()  # one clock read, no datetime allocation
         new_reading = {
-            'temperature': reading.temperature,
-            'humidity': reading.humidity,
-            'timestamp': datetime.now().isoformat()
+            'temperature': reading['temperature'],
+            'humidity': reading['humidity'],
+            'timestamp': datetime.fromtimestamp(now_ns / 1e9).isoformat(),
+            'ts': now_ns // 1_000_000  # epoch millis, indexed for range queries
         }
-        ref.push(new_reading)
+        await _db_request('post', 'readings', json=new_reading)
+        await _update_stats_bucket(new_reading['ts'], [(reading['temperature'], reading['humidity'])])
+        _invalidate_caches()
         return {
             "status": "success",
             "message": "Reading recorded",
@@ -75,80 +415,137 @@ async def add_reading(reading: SensorReading):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/readings")
-async def get_readings(hours: int = 24) -> List[ReadingResponse]:
-    """Get all temperature and humidity readings"""
+@app.post("/readings/batch")
+async def add_readings_batch(request: Request):
+    """Add a burst of readings in a single multi-location update"""
     try:
-        ref = db.reference('readings')
-        readings = ref.get()
+        try:
+            readings = orjson.loads(await request.body())
+        except orjson.JSONDecodeError as e:
+            raise HTTPException(status_code=422, detail=str(e))
 
+        if not isinstance(readings, list):
+            raise HTTPException(status_code=422, detail="Expected a JSON array of readings")
         if not readings:
-            return []
+            raise HTTPException(status_code=400, detail="Batch is empty")
 
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        filtered_readings = []
+        now_ns = time.time_ns()
+        base = {
+            'timestamp': datetime.fromtimestamp(now_ns / 1e9).isoformat(),
+            'ts': now_ns // 1_000_000
+        }
+        payload = {}
+        results = []
+        for reading in readings:
+            try:
+                _validate_reading(reading)
+            except fastjsonschema.JsonSchemaException as e:
+                results.append(f"rejected: {e.message}")
+                continue
+            results.append("accepted")
+            payload[uuid4().hex] = {
+                'temperature': reading['temperature'],
+                'humidity': reading['humidity'],
+                **base
+            }
 
-        for key, reading in readings.items():
-            timestamp = datetime.fromisoformat(reading['timestamp'])
-            if timestamp > cutoff_time:
-                filtered_readings.append({
-                    "temperature": reading['temperature'],
-                    "humidity": reading['humidity'],
-                    "timestamp": reading['timestamp']
-                })
+        if payload:
+            # One PATCH writes every child at once — N round trips become one
+            await _db_request('patch', 'readings', json=payload)
+            await _update_stats_bucket(
+                base['ts'], [(r['temperature'], r['humidity']) for r in payload.values()])
+            _invalidate_caches()
 
-        return sorted(filtered_readings, key=lambda x: x['timestamp'])
+        return {
+            "status": "success",
+            "message": f"{len(payload)} of {len(readings)} readings recorded",
+            "results": results
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/analysis")
-async def get_analysis(hours: int = 24):
-    """Get trend analysis and statistics"""
+def _reading_row(reading):
+    return {
+        "temperature": reading['temperature'],
+        "humidity": reading['humidity'],
+        "timestamp": reading['timestamp'],
+        "ts": reading['ts']
+    }
+
+
+@app.get("/readings")
+async def get_readings(request: Request, hours: int = 24,
+                       since: Optional[int] = None) -> List[ReadingResponse]:
+    """Get temperature and humidity readings.
+
+    Pass since=<ts of the newest reading already held> to receive only the
+    delta instead of re-downloading the whole window. Send
+    Accept: application/x-ndjson to stream rows line-by-line instead of one
+    big JSON array — worthwhile for multi-day windows.
+    """
     try:
-        ref = db.reference('readings')
-        readings = ref.get()
+        if since is not None:
+            # ts is integral millis, so startAt since+1 is an exclusive bound
+            readings = await _fetch_readings_since(since + 1)
+        else:
+            readings = await _get_recent_readings(hours)
+
+        if 'application/x-ndjson' in request.headers.get('accept', ''):
+            # Rows are serialized and sent as generated — no full list/array
+            # materialization, and the first byte goes out immediately
+            def row_gen():
+                for reading in readings.values():
+                    yield orjson.dumps(_reading_row(reading)) + b"\n"
+
+            return StreamingResponse(row_gen(), media_type='application/x-ndjson')
 
         if not readings:
-            raise HTTPException(status_code=404, detail="No readings found")
+            return []
+
+        # Server already filtered and ordered by 'ts' — no re-sort needed
+        return [_reading_row(reading) for reading in readings.values()]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/stream")
+async def stream_readings():
+    """Push new readings to clients as Server-Sent Events"""
+    queue = asyncio.Queue()
+    _stream_subscribers.add(queue)
+
+    async def event_gen():
+        try:
+            while True:
+                data = await queue.get()
+                yield f"data: {data}\n\n"
+        finally:
+            _stream_subscribers.discard(queue)
 
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        temps = []
-        humidities = []
-        timestamps = []
+    return StreamingResponse(event_gen(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache'})
 
-        for key, reading in readings.items():
-            timestamp = datetime.fromisoformat(reading['timestamp'])
-            if timestamp > cutoff_time:
-                temps.append(reading['temperature'])
-                humidities.append(reading['humidity'])
-                timestamps.append(timestamp)
 
-        if not temps:
+@app.get("/analysis")
+async def get_analysis(hours: int = 24):
+    """Get trend analysis and statistics"""
+    try:
+        cache_key = (hours, _data_version)
+        cached = _analysis_cache.get(cache_key)
+        if cached and time.monotonic() < cached[0]:
+            return ORJSONResponse(cached[1], headers=_ANALYSIS_CACHE_HEADERS)
+
+        readings = await _get_recent_readings(hours)
+
+        if not readings:
             raise HTTPException(status_code=404, detail="No recent readings found")
 
-        # Calculate statistics
-        avg_temp = mean(temps)
-        avg_humidity = mean(humidities)
-        max_temp = max(temps)
-        min_temp = min(temps)
-        max_humidity = max(humidities)
-        min_humidity = min(humidities)
-
-        # Trend detection
-        sorted_data = sorted(zip(timestamps, temps, humidities), key=lambda x: x[0])
-
-        if len(sorted_data) > 1:
-            first_half_temp = [t[1] for t in sorted_data[:len(sorted_data) // 2]]
-            second_half_temp = [t[1] for t in sorted_data[len(sorted_data) // 2:]]
-            temp_trend = "↑ Rising" if mean(second_half_temp) > mean(first_half_temp) else "↓ Falling"
-
-            first_half_hum = [t[2] for t in sorted_data[:len(sorted_data) // 2]]
-            second_half_hum = [t[2] for t in sorted_data[len(sorted_data) // 2:]]
-            humidity_trend = "↑ Rising" if mean(second_half_hum) > mean(first_half_hum) else "↓ Falling"
-        else:
-            temp_trend = "→ Stable"
-            humidity_trend = "→ Stable"
+        stats = _analyze_readings(readings)
+        avg_temp = stats['avg_temp']
+        avg_humidity = stats['avg_humidity']
 
         # Comfort analysis
         comfort_score = 0
@@ -182,35 +579,20 @@ async def get_analysis(hours: int = 24):
         else:
             comfort_level = "Poor"
 
-        # Anomaly detection
-        anomalies = []
-        if len(temps) > 2:
-            temp_std = stdev(temps)
-            humidity_std = stdev(humidities)
-
-            for i, (ts, temp, hum) in enumerate(sorted_data):
-                if abs(temp - avg_temp) > 2 * temp_std or abs(hum - avg_humidity) > 2 * humidity_std:
-                    anomalies.append({
-                        'temperature': temp,
-                        'humidity': hum,
-                        'timestamp': ts.isoformat(),
-                        'reason': 'Temperature spike' if abs(temp - avg_temp) > 2 * temp_std else 'Humidity spike'
-                    })
-
-        return {
+        payload = {
             "period_hours": hours,
-            "readings_count": len(temps),
+            "readings_count": len(readings),
             "temperature": {
                 "average": round(avg_temp, 2),
-                "max": round(max_temp, 2),
-                "min": round(min_temp, 2),
-                "trend": temp_trend
+                "max": round(stats['max_temp'], 2),
+                "min": round(stats['min_temp'], 2),
+                "trend": stats['temp_trend']
             },
             "humidity": {
                 "average": round(avg_humidity, 2),
-                "max": round(max_humidity, 2),
-                "min": round(min_humidity, 2),
-                "trend": humidity_trend
+                "max": round(stats['max_humidity'], 2),
+                "min": round(stats['min_humidity'], 2),
+                "trend": stats['humidity_trend']
             },
             "comfort": {
                 "level": comfort_level,
@@ -218,18 +600,76 @@ async def get_analysis(hours: int = 24):
                 "temperature_comment": temp_comment,
                 "humidity_comment": humidity_comment
             },
-            "anomalies": anomalies[:5]
+            "anomalies": stats['anomalies']
         }
+        _analysis_cache[cache_key] = (time.monotonic() + _ANALYSIS_CACHE_TTL, payload)
+        return ORJSONResponse(payload, headers=_ANALYSIS_CACHE_HEADERS)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/dashboard", response_class=HTMLResponse)
-async def get_dashboard():
-    """Interactive dashboard with graphs and trend analysis"""
-    return """
+@app.get("/stats")
+async def get_stats(hours: int = 24):
+    """Summary statistics folded from the rolling hourly aggregate buckets.
+
+    O(hours) tiny bucket reads regardless of how many raw readings exist;
+    the window is bucket-aligned, so it may include up to an hour extra.
+    """
+    try:
+        first_bucket = int(time.time() * 1000) // _BUCKET_MS - hours
+        buckets = await _db_request(
+            'get', 'stats',
+            params={'orderBy': '"$key"', 'startAt': f'"{first_bucket}"'}) or {}
+
+        merged = None
+        for bucket in buckets.values():
+            if merged is None:
+                merged = dict(bucket)
+            else:
+                merged['count'] += bucket['count']
+                merged['sum_t'] += bucket['sum_t']
+                merged['sum_t2'] += bucket['sum_t2']
+                merged['min_t'] = min(merged['min_t'], bucket['min_t'])
+                merged['max_t'] = max(merged['max_t'], bucket['max_t'])
+                merged['sum_h'] += bucket['sum_h']
+                merged['sum_h2'] += bucket['sum_h2']
+                merged['min_h'] = min(merged['min_h'], bucket['min_h'])
+                merged['max_h'] = max(merged['max_h'], bucket['max_h'])
+
+        if not merged:
+            raise HTTPException(status_code=404, detail="No recent readings found")
+
+        n = merged['count']
+        std_t = math.sqrt(max(0.0, (merged['sum_t2'] - merged['sum_t'] ** 2 / n) / (n - 1))) if n > 1 else 0.0
+        std_h = math.sqrt(max(0.0, (merged['sum_h2'] - merged['sum_h'] ** 2 / n) / (n - 1))) if n > 1 else 0.0
+
+        return {
+            "period_hours": hours,
+            "readings_count": n,
+            "temperature": {
+                "average": round(merged['sum_t'] / n, 2),
+                "max": round(merged['max_t'], 2),
+                "min": round(merged['min_t'], 2),
+                "std": round(std_t, 2)
+            },
+            "humidity": {
+                "average": round(merged['sum_h'] / n, 2),
+                "max": round(merged['max_h'], 2),
+                "min": round(merged['min_h'], 2),
+                "std": round(std_h, 2)
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# The dashboard page is a constant — encode and hash it once at import time
+# instead of re-encoding the string on every request
+_DASHBOARD_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -397,19 +837,29 @@ async def get_dashboard():
 
         <script>
             let tempChart, humidityChart;
+            let buffer = [];       // readings currently charted
+            let lastSeenTs = 0;    // ts of the newest reading in the buffer
+            let currentHours = null;
 
             async function loadData() {
                 document.getElementById('loadingDiv').style.display = 'block';
                 const hours = document.getElementById('hoursSelect').value;
+                // Same window as last time: only fetch the delta since lastSeenTs
+                const delta = hours === currentHours && lastSeenTs > 0;
+                const readingsUrl = delta ? `/readings?since=${lastSeenTs}` : `/readings?hours=${hours}`;
 
                 try {
                     const [readings, analysis] = await Promise.all([
-                        fetch(`/readings?hours=${hours}`).then(r => r.json()),
+                        fetchReadings(readingsUrl, !delta),
                         fetch(`/analysis?hours=${hours}`).then(r => r.json())
                     ]);
 
+                    buffer = delta ? buffer.concat(readings) : readings;
+                    currentHours = hours;
+                    if (buffer.length > 0) lastSeenTs = buffer[buffer.length - 1].ts;
+
                     displayStats(analysis);
-                    displayCharts(readings, analysis);
+                    displayCharts(buffer, analysis);
                     displayAnomalies(analysis);
                 } catch (error) {
                     alert('Error loading data: ' + error);
@@ -418,6 +868,29 @@ async def get_dashboard():
                 }
             }
 
+            async function fetchReadings(url, stream) {
+                // Full-window fetches stream as NDJSON and parse line-by-line;
+                // small delta fetches stay plain JSON
+                if (!stream) return fetch(url).then(r => r.json());
+                const resp = await fetch(url, { headers: { 'Accept': 'application/x-ndjson' } });
+                const reader = resp.body.getReader();
+                const decoder = new TextDecoder();
+                const rows = [];
+                let tail = '';
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    tail += decoder.decode(value, { stream: true });
+                    const lines = tail.split('\\n');
+                    tail = lines.pop();
+                    for (const line of lines) {
+                        if (line) rows.push(JSON.parse(line));
+                    }
+                }
+                if (tail.trim()) rows.push(JSON.parse(tail));
+                return rows;
+            }
+
             function displayStats(analysis) {
                 const comfortClass = 'comfort-' + analysis.comfort.level.toLowerCase();
                 const html = `
@@ -449,6 +922,7 @@ async def get_dashboard():
             function displayCharts(readings, analysis) {
                 if (readings.length === 0) {
                     document.getElementById('chartsDiv').innerHTML = '<div class="no-data">No data available</div>';
+                    tempChart = humidityChart = null;
                     return;
                 }
 
@@ -456,6 +930,17 @@ async def get_dashboard():
                 const temps = readings.map(r => r.temperature);
                 const humidities = readings.map(r => r.humidity);
 
+                if (tempChart && humidityChart && document.getElementById('tempChart')) {
+                    // Swap the datasets in place — no canvas teardown, no flicker
+                    tempChart.data.labels = timestamps;
+                    tempChart.data.datasets[0].data = temps;
+                    tempChart.update('none');
+                    humidityChart.data.labels = timestamps;
+                    humidityChart.data.datasets[0].data = humidities;
+                    humidityChart.update('none');
+                    return;
+                }
+
                 const html = `
                     <div class="chart-container">
                         <canvas id="tempChart"></canvas>
@@ -466,57 +951,55 @@ async def get_dashboard():
                 `;
                 document.getElementById('chartsDiv').innerHTML = html;
 
-                setTimeout(() => {
-                    const tempCtx = document.getElementById('tempChart').getContext('2d');
-                    tempChart = new Chart(tempCtx, {
-                        type: 'line',
-                        data: {
-                            labels: timestamps,
-                            datasets: [{
-                                label: 'Temperature (°C)',
-                                data: temps,
-                                borderColor: '#ff6b6b',
-                                backgroundColor: 'rgba(255, 107, 107, 0.1)',
-                                borderWidth: 2,
-                                fill: true,
-                                tension: 0.4,
-                                pointRadius: 4,
-                                pointBackgroundColor: '#ff6b6b'
-                            }]
-                        },
-                        options: {
-                            responsive: true,
-                            maintainAspectRatio: false,
-                            plugins: { legend: { display: true, position: 'top' } },
-                            scales: { y: { beginAtZero: false } }
-                        }
-                    });
+                const tempCtx = document.getElementById('tempChart').getContext('2d');
+                tempChart = new Chart(tempCtx, {
+                    type: 'line',
+                    data: {
+                        labels: timestamps,
+                        datasets: [{
+                            label: 'Temperature (°C)',
+                            data: temps,
+                            borderColor: '#ff6b6b',
+                            backgroundColor: 'rgba(255, 107, 107, 0.1)',
+                            borderWidth: 2,
+                            fill: true,
+                            tension: 0.4,
+                            pointRadius: 4,
+                            pointBackgroundColor: '#ff6b6b'
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        plugins: { legend: { display: true, position: 'top' } },
+                        scales: { y: { beginAtZero: false } }
+                    }
+                });
 
-                    const humidityCtx = document.getElementById('humidityChart').getContext('2d');
-                    humidityChart = new Chart(humidityCtx, {
-                        type: 'line',
-                        data: {
-                            labels: timestamps,
-                            datasets: [{
-                                label: 'Humidity (%)',
-                                data: humidities,
-                                borderColor: '#4ecdc4',
-                                backgroundColor: 'rgba(78, 205, 196, 0.1)',
-                                borderWidth: 2,
-                                fill: true,
-                                tension: 0.4,
-                                pointRadius: 4,
-                                pointBackgroundColor: '#4ecdc4'
-                            }]
-                        },
-                        options: {
-                            responsive: true,
-                            maintainAspectRatio: false,
-                            plugins: { legend: { display: true, position: 'top' } },
-                            scales: { y: { min: 0, max: 100 } }
-                        }
-                    });
-                }, 0);
+                const humidityCtx = document.getElementById('humidityChart').getContext('2d');
+                humidityChart = new Chart(humidityCtx, {
+                    type: 'line',
+                    data: {
+                        labels: timestamps,
+                        datasets: [{
+                            label: 'Humidity (%)',
+                            data: humidities,
+                            borderColor: '#4ecdc4',
+                            backgroundColor: 'rgba(78, 205, 196, 0.1)',
+                            borderWidth: 2,
+                            fill: true,
+                            tension: 0.4,
+                            pointRadius: 4,
+                            pointBackgroundColor: '#4ecdc4'
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        plugins: { legend: { display: true, position: 'top' } },
+                        scales: { y: { min: 0, max: 100 } }
+                    }
+                });
             }
 
             function displayAnomalies(analysis) {
@@ -561,20 +1044,60 @@ async def get_dashboard():
                 }
             }
 
+            function appendReading(reading) {
+                buffer.push(reading);
+                if (reading.ts) lastSeenTs = reading.ts;
+                if (!tempChart || !humidityChart) return;
+                const label = new Date(reading.timestamp).toLocaleTimeString();
+                tempChart.data.labels.push(label);
+                tempChart.data.datasets[0].data.push(reading.temperature);
+                humidityChart.data.labels.push(label);
+                humidityChart.data.datasets[0].data.push(reading.humidity);
+                tempChart.update('none');
+                humidityChart.update('none');
+            }
+
             loadData();
-            setInterval(loadData, 60000);
+
+            // New readings are pushed over SSE — no more 60s polling
+            const events = new EventSource('/stream');
+            events.onmessage = (e) => appendReading(JSON.parse(e.data));
         </script>
     </body>
     </html>
     """
 
+_DASHBOARD_BYTES = _DASHBOARD_HTML.encode('utf-8')
+_DASHBOARD_GZIP = gzip.compress(_DASHBOARD_BYTES, 9)  # compressed once at import
+_DASHBOARD_ETAG = f'"{hashlib.md5(_DASHBOARD_BYTES).hexdigest()}"'
+
+
+@app.get("/dashboard")
+async def get_dashboard(request: Request):
+    """Interactive dashboard with graphs and trend analysis"""
+    if request.headers.get('if-none-match') == _DASHBOARD_ETAG:
+        return Response(status_code=304)
+
+    headers = {
+        'Cache-Control': 'public, max-age=3600',
+        'ETag': _DASHBOARD_ETAG,
+        'Vary': 'Accept-Encoding'
+    }
+    # Serve the pre-compressed body directly; the explicit Content-Encoding
+    # also keeps GZipMiddleware from re-compressing it per request
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+        return Response(content=_DASHBOARD_GZIP, media_type='text/html', headers=headers)
+    return Response(content=_DASHBOARD_BYTES, media_type='text/html', headers=headers)
+
 
 @app.delete("/readings")
 async def clear_all_readings():
     """Clear all readings"""
     try:
-        ref = db.reference('readings')
-        ref.delete()
+        await _db_request('delete', 'readings')
+        await _db_request('delete', 'stats')
+        _invalidate_caches()
         return {"status": "success", "message": "All readings deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file